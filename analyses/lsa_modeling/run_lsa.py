@@ -3,18 +3,20 @@
 import argparse
 
 from delay_discounting_mvpa.config_loader import load_config
-from delay_discounting_mvpa.design_utils import create_design_matrices
-from delay_discounting_mvpa.fmri_io import load_and_gm_scale_bold_data
-from delay_discounting_mvpa.fmri_model import (
-    compute_betas,
-    save_beta_series,
-)
-from delay_discounting_mvpa.io_utils import load_tsv_data, resolve_file
 
 
 def main(
     subid: str, hp_filter_cutoff: float, outdir: str, config_file: str = 'config.yaml'
 ):
+    # Imported here so --help and argument errors don't pay for
+    # nilearn/nibabel/pandas start-up
+    from delay_discounting_mvpa.design_utils import create_design_matrices
+    from delay_discounting_mvpa.fmri_io import load_and_gm_scale_bold_data
+    from delay_discounting_mvpa.fmri_model import (
+        compute_betas,
+        save_beta_series,
+    )
+
     # Load config
     cfg = load_config(config_file)
 
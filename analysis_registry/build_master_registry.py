@@ -2,101 +2,239 @@
 """
 Build the master analysis registry by combining all YAML files in analyses/
 and generating a human-readable Markdown summary (block format).
+
+Use --format to choose the Markdown output(s): summary (table plus detailed
+sections, written to README.md), detail (detailed sections only) and/or table
+(summary table only). The YAML files are parsed once for all formats.
 """
 
+import argparse
+import hashlib
+import os
+import pickle
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import yaml
 
+try:
+    from yaml import CSafeDumper as _Dumper
+    from yaml import CSafeLoader as _Loader
+except ImportError:  # libyaml not available
+    from yaml import SafeDumper as _Dumper
+    from yaml import SafeLoader as _Loader
+
 ANALYSIS_DIR = Path(__file__).parent / 'analyses'
 MASTER_YAML = Path(__file__).parent / 'master_registry.yaml'
 MASTER_MD = Path(__file__).parent / 'README.md'
+MASTER_DETAIL_MD = Path(__file__).parent / 'registry_detail.md'
+MASTER_TABLE_MD = Path(__file__).parent / 'registry_table.md'
+
+
+def _parse_one(yaml_file: Path):
+    """Load a single YAML file."""
+    with open(yaml_file, 'r') as f:
+        return yaml.load(f, Loader=_Loader)
 
 
 def load_yaml_files(yaml_dir: Path):
     """Load all YAML files in a directory and return a list of dicts."""
-    all_entries = []
-    for yaml_file in sorted(yaml_dir.glob('*.yaml')):
-        with open(yaml_file, 'r') as f:
-            data = yaml.safe_load(f)
-            all_entries.append(data)
-    return all_entries
+    with os.scandir(yaml_dir) as it:
+        names = sorted(e.name for e in it if e.is_file() and e.name.endswith('.yaml'))
+    yaml_files = [yaml_dir / name for name in names]
+    # Files are independent, so overlap open/parse; map() keeps sorted order
+    with ThreadPoolExecutor(max_workers=min(16, os.cpu_count() or 1)) as ex:
+        return list(ex.map(_parse_one, yaml_files))
+
+
+def _registry_cache_file(yaml_dir: Path) -> Path:
+    """Return the entries cache path keyed on the YAML names and mtimes."""
+    with os.scandir(yaml_dir) as it:
+        stamps = sorted(
+            (e.name, e.stat().st_mtime_ns, e.stat().st_size)
+            for e in it
+            if e.is_file() and e.name.endswith('.yaml')
+        )
+    key = hashlib.md5(repr(stamps).encode()).hexdigest()
+    return yaml_dir / f'.registry.{key}.pkl'
+
+
+def load_entries(yaml_dir: Path):
+    """Load registry entries, reusing the pickled copy if no YAML file changed."""
+    cache_file = _registry_cache_file(yaml_dir)
+    try:
+        with open(cache_file, 'rb') as f:
+            return pickle.load(f)
+    except Exception:
+        pass
+
+    entries = load_yaml_files(yaml_dir)
+
+    # Drop caches for older versions of the YAML files, then store this one
+    for stale in yaml_dir.glob('.registry.*.pkl'):
+        if stale != cache_file:
+            stale.unlink(missing_ok=True)
+    tmp_file = cache_file.with_name(f'{cache_file.name}.{os.getpid()}.tmp')
+    try:
+        with open(tmp_file, 'wb') as f:
+            pickle.dump(entries, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        tmp_file.unlink(missing_ok=True)
+    return entries
 
 
 def write_master_yaml(entries, output_file: Path):
     with open(output_file, 'w') as f:
-        yaml.safe_dump(entries, f, sort_keys=False)
+        yaml.dump(entries, f, Dumper=_Dumper, sort_keys=False)
+
+
+SUMMARY_ROW_TEMPLATE = '| {} | {} | {} | {} |\n'
+
+# One detailed-report block per entry; missing fields render as 'None'. Each
+# block opens with its separating blank line so the file ends at the last '---'
+DETAIL_TEMPLATE = (
+    '\n### {id}\n'
+    '**Name:** {name}<br>\n'
+    '**Description:** {description}<br>\n'
+    '**Code Directory:** {code_dir}<br>\n'
+    '**Dependencies:** {dependencies}<br>\n'
+    '**Script Entry:** {script_entry}<br>\n'
+    '**Notebook Entry:** {notebook_entry}<br>\n'
+    '**Output Directory:** {output_dir}<br>\n'
+    '**Hypothesis:** {hypothesis}<br>\n'
+    '**Conclusion:** {conclusion}<br>\n'
+    '**Notes:** {notes}<br>\n'
+    '**Status:** {status}<br>\n'
+    '**Last Updated:** {last_updated}<br>\n'
+    '**Authors:** {authors}<br>\n'
+    '\n---\n'  # separator between entries
+)
+
+
+class _SafeDict(dict):
+    """Mapping for str.format_map that renders missing keys as 'None'."""
+
+    def __missing__(self, key):
+        return 'None'
+
+
+def _none_to_str(entry):
+    return 'None'
+
+
+def _list_to_str(entry):
+    return ', '.join(map(str, entry)) if entry else 'None'
+
+
+# Exact-type dispatch for stringify_entry; anything else falls back to str()
+_STRINGIFY = {
+    type(None): _none_to_str,
+    list: _list_to_str,
+    str: str,
+}
 
 
 def stringify_entry(entry):
     """Convert YAML lists, None, or scalars into strings."""
-    if entry is None:
-        return 'None'
-    if isinstance(entry, list):
-        if not entry:
-            return 'None'
-        return ', '.join(str(x) for x in entry)
-    return str(entry)
+    return _STRINGIFY.get(type(entry), str)(entry)
 
 
-def write_markdown_summary(entries, output_file: Path):
-    """Write a Markdown summary with a top summary table and detailed sections with bold fields."""
-    md_lines = ['# Master Analysis Registry\n']
-
-    # --- Summary Table ---
-    md_lines.append('## Summary\n')
-    md_lines.append('| ID | Description | Status | Notes |')
-    md_lines.append('|----|------------|--------|-------|')
+def _iter_table_md(entries):
+    """Yield newline-terminated Markdown lines for the summary table."""
+    yield '| ID | Description | Status | Notes |\n'
+    yield '|----|------------|--------|-------|\n'
 
     for e in entries:
-        desc = e.get('description', 'None').strip().replace('\n', ' ')
-        notes = e.get('notes', 'None')
-        status = e.get('status', 'None')
-        md_lines.append(f'| {e.get("id", "None")} | {desc} | {status} | {notes} |')
+        g = e.get
+        desc = g('description', 'None').strip().replace('\n', ' ')
+        yield SUMMARY_ROW_TEMPLATE.format(
+            g('id', 'None'), desc, g('status', 'None'), g('notes', 'None')
+        )
 
-    md_lines.append('\n---\n')  # separator before detailed section
-    md_lines.append('## Detailed Reports\n')
 
-    # --- Detailed Sections ---
+def _iter_detail_md(entries):
+    """Yield one Markdown block per entry, each preceded by a blank line."""
     for e in entries:
-        md_lines.append(f'### {e.get("id", "Unknown ID")}')
-        md_lines.append(f'**Name:** {e.get("name", "None")}<br>')
-        md_lines.append(f'**Description:** {e.get("description", "None").strip()}<br>')
-        md_lines.append(f'**Code Directory:** {e.get("code_dir", "None")}<br>')
-        md_lines.append(
-            f'**Dependencies:** {stringify_entry(e.get("dependencies"))}<br>'
-        )
-        md_lines.append(
-            f'**Script Entry:** {stringify_entry(e.get("script_entry"))}<br>'
-        )
-        md_lines.append(
-            f'**Notebook Entry:** {stringify_entry(e.get("notebook_entry"))}<br>'
-        )
-        md_lines.append(
-            f'**Output Directory:** {stringify_entry(e.get("output_dir"))}<br>'
-        )
-        md_lines.append(f'**Hypothesis:** {stringify_entry(e.get("hypothesis"))}<br>')
-        md_lines.append(f'**Conclusion:** {stringify_entry(e.get("conclusion"))}<br>')
-        md_lines.append(f'**Notes:** {stringify_entry(e.get("notes"))}<br>')
-        md_lines.append(f'**Status:** {stringify_entry(e.get("status"))}<br>')
-        md_lines.append(
-            f'**Last Updated:** {stringify_entry(e.get("last_updated"))}<br>'
-        )
-        md_lines.append(f'**Authors:** {stringify_entry(e.get("authors"))}<br>')
-        md_lines.append('\n---\n')  # separator between entries
+        fields = _SafeDict({k: stringify_entry(v) for k, v in e.items()})
+        fields.setdefault('id', 'Unknown ID')
+        if 'description' in fields:
+            fields['description'] = fields['description'].strip()
+        yield DETAIL_TEMPLATE.format_map(fields)
 
-    # Write to file
-    with open(output_file, 'w') as f:
-        f.write('\n'.join(md_lines))
+
+def _iter_detail_only_md(entries):
+    """Yield the page title followed by the detailed sections."""
+    yield '# Master Analysis Registry\n'
+    yield from _iter_detail_md(entries)
+
+
+def _iter_table_only_md(entries):
+    """Yield the page title followed by the summary table."""
+    yield '# Master Analysis Registry\n\n'
+    yield from _iter_table_md(entries)
+
+
+def _iter_summary_md(entries):
+    """Yield the summary table followed by the detailed sections."""
+    yield '# Master Analysis Registry\n\n'
+    yield '## Summary\n\n'
+    yield from _iter_table_md(entries)
+    yield '\n---\n\n'  # separator before detailed section
+    yield '## Detailed Reports\n'
+    yield from _iter_detail_md(entries)
+
+
+def _write_md(chunks, output_file: Path):
+    # Stream lines straight to a buffered file rather than joining one big string
+    with open(output_file, 'w', buffering=1 << 16) as f:
+        f.writelines(chunks)
+
+
+def write_summary_md(entries, output_file: Path):
+    """Write a Markdown summary with a top summary table and detailed sections with bold fields."""
+    _write_md(_iter_summary_md(entries), output_file)
+
+
+def write_detail_md(entries, output_file: Path):
+    """Write only the detailed sections with bold fields."""
+    _write_md(_iter_detail_only_md(entries), output_file)
+
+
+def write_table_md(entries, output_file: Path):
+    """Write only the summary table."""
+    _write_md(_iter_table_only_md(entries), output_file)
+
+
+# Markdown output formats: name -> (writer, output file)
+MD_FORMATS = {
+    'summary': (write_summary_md, MASTER_MD),
+    'detail': (write_detail_md, MASTER_DETAIL_MD),
+    'table': (write_table_md, MASTER_TABLE_MD),
+}
 
 
-def main():
-    entries = load_yaml_files(ANALYSIS_DIR)
+def main(formats=('summary',)):
+    # Parse the YAML once and fan out to every requested format
+    entries = load_entries(ANALYSIS_DIR)
     write_master_yaml(entries, MASTER_YAML)
-    write_markdown_summary(entries, MASTER_MD)
     print(f'Master YAML written to {MASTER_YAML}')
-    print(f'Markdown summary written to {MASTER_MD}')
+    for fmt in dict.fromkeys(formats):
+        writer, output_file = MD_FORMATS[fmt]
+        writer(entries, output_file)
+        print(f'Markdown {fmt} written to {output_file}')
 
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(
+        description='Build the master analysis registry YAML and Markdown files.'
+    )
+    parser.add_argument(
+        '--format',
+        nargs='+',
+        choices=list(MD_FORMATS),
+        default=['summary'],
+        help='Markdown output format(s) to write (default: summary)',
+    )
+    args = parser.parse_args()
+    main(args.format)
@@ -3,13 +3,25 @@
 Minimal Config Loader for Delay Discounting MVPA
 """
 
+import contextlib
+import hashlib
+import importlib.metadata
 import os
-from dataclasses import dataclass, field
+import pickle
+import stat
+import tempfile
+from dataclasses import MISSING, dataclass, field, fields
+from functools import lru_cache
 from pathlib import Path
-from typing import Any, Dict, Union
+from typing import Any, Dict, Optional, Union
 
 import yaml
 
+try:
+    from yaml import CSafeLoader as _Loader
+except ImportError:  # libyaml not available
+    from yaml import SafeLoader as _Loader
+
 
 class ConfigError(Exception):
     pass
@@ -20,7 +32,7 @@ def _to_path(v: Union[str, Path]) -> Path:
     return v if isinstance(v, Path) else Path(v)
 
 
-@dataclass
+@dataclass(slots=True)
 class Config:
     # Required from YAML
     data_root: Path
@@ -36,22 +48,30 @@ class Config:
     masks_dir: Path
     tr: float = 0.68
 
-    # Derived fields
-    bold_file_glob: str = field(init=False)
-    bold_mask_file_glob: str = field(init=False)
-    behav_file_glob: str = field(init=False)
+    # Lazily-built derived globs (see properties below); slots rule out
+    # cached_property, so these are plain backing attributes
+    _bold_file_glob: Optional[str] = field(
+        init=False, default=None, repr=False, compare=False
+    )
+    _bold_mask_file_glob: Optional[str] = field(
+        init=False, default=None, repr=False, compare=False
+    )
+    _behav_file_glob: Optional[str] = field(
+        init=False, default=None, repr=False, compare=False
+    )
 
     def __post_init__(self):
         # --- Ensure all path fields are Path objects ---
-        path_fields = [
-            'data_root',
-            'fmriprep_dir',
-            'bids_dir',
-            'output_root',
-            'masks_dir',
-        ]
-        for f in path_fields:
-            setattr(self, f, _to_path(getattr(self, f)))
+        if not isinstance(self.data_root, Path):
+            self.data_root = Path(self.data_root)
+        if not isinstance(self.fmriprep_dir, Path):
+            self.fmriprep_dir = Path(self.fmriprep_dir)
+        if not isinstance(self.bids_dir, Path):
+            self.bids_dir = Path(self.bids_dir)
+        if not isinstance(self.output_root, Path):
+            self.output_root = Path(self.output_root)
+        if not isinstance(self.masks_dir, Path):
+            self.masks_dir = Path(self.masks_dir)
 
         # --- Normalize bold_func_glob (string only) ---
         if not isinstance(self.bold_func_glob, str):
@@ -65,27 +85,138 @@ class Config:
         if not self.behav_func_glob.endswith('/'):
             self.behav_func_glob += '/'
 
-        # --- Derived glob patterns (still strings) ---
-        self.bold_file_glob = (
-            f'{self.bold_func_glob}*{self.task_name}{self.bold_data_suffix}'
-        )
-        self.bold_mask_file_glob = (
-            f'{self.bold_func_glob}*{self.task_name}{self.mask_data_suffix}'
-        )
-
-        self.behav_file_glob = (
-            f'{self.behav_func_glob}*{self.task_name}{self.behav_data_suffix}'
+    # --- Derived glob patterns (still strings), built on first access ---
+    @property
+    def bold_file_glob(self) -> str:
+        if self._bold_file_glob is None:
+            self._bold_file_glob = (
+                f'{self.bold_func_glob}*{self.task_name}{self.bold_data_suffix}'
+            )
+        return self._bold_file_glob
+
+    @property
+    def bold_mask_file_glob(self) -> str:
+        if self._bold_mask_file_glob is None:
+            self._bold_mask_file_glob = (
+                f'{self.bold_func_glob}*{self.task_name}{self.mask_data_suffix}'
+            )
+        return self._bold_mask_file_glob
+
+    @property
+    def behav_file_glob(self) -> str:
+        if self._behav_file_glob is None:
+            self._behav_file_glob = (
+                f'{self.behav_func_glob}*{self.task_name}{self.behav_data_suffix}'
+            )
+        return self._behav_file_glob
+
+
+@lru_cache(maxsize=1)
+def _config_schema_key() -> str:
+    """
+    Short hash of Config's fields, its __post_init__ and the package version.
+
+    Part of every cache file name, so changing the dataclass invalidates old
+    pickles without anyone having to remember to bump a version by hand.
+    """
+    try:
+        version = importlib.metadata.version('delay-discounting-mvpa')
+    except importlib.metadata.PackageNotFoundError:
+        version = 'unknown'
+    post_init = Config.__post_init__.__code__
+    # MISSING's repr embeds its address, so required fields hash as None
+    defaults = (None if f.default is MISSING else f.default for f in fields(Config))
+    schema = (
+        version,
+        tuple((f.name, str(f.type), d) for f, d in zip(fields(Config), defaults)),
+        post_init.co_code,
+        post_init.co_consts,
+    )
+    return hashlib.sha256(repr(schema).encode()).hexdigest()[:12]
+
+
+def _config_cache_dir() -> Optional[Path]:
+    """
+    Return this user's private cache directory, or None if it can't be trusted.
+
+    The directory is per-uid and created 0o700, so users sharing a node (and a
+    config file) never collide on cache paths or read each other's pickles.
+    """
+    cache_dir = Path(tempfile.gettempdir()) / f'dd_mvpa_config-{os.getuid()}'
+    try:
+        cache_dir.mkdir(mode=0o700, exist_ok=True)
+        st = os.lstat(cache_dir)
+    except OSError:
+        return None
+    # Refuse a directory (or symlink) pre-created by someone else
+    if (
+        not stat.S_ISDIR(st.st_mode)
+        or st.st_uid != os.getuid()
+        or st.st_mode & (stat.S_IRWXG | stat.S_IRWXO)
+    ):
+        return None
+    return cache_dir
+
+
+def _config_cache_file(raw: bytes) -> Optional[Path]:
+    """Return the pickle cache location for a config with the given contents."""
+    cache_dir = _config_cache_dir()
+    if cache_dir is None:
+        return None
+    digest = hashlib.sha256(raw).hexdigest()[:16]
+    return cache_dir / f'config.{_config_schema_key()}.{digest}.pkl'
+
+
+def _read_cached_config(cache_file: Path) -> Optional[Config]:
+    """Return the cached Config, or None if missing, foreign or unreadable."""
+    try:
+        with open(cache_file, 'rb') as f:
+            # Only trust pickles written by the current user
+            if os.fstat(f.fileno()).st_uid != os.getuid():
+                return None
+            cfg = pickle.load(f)
+    except Exception:
+        return None
+    return cfg if isinstance(cfg, Config) else None
+
+
+def _write_cached_config(cfg: Config, cache_file: Path) -> None:
+    """Atomically pickle cfg to cache_file; failures are ignored."""
+    tmp_name = None
+    try:
+        fd, tmp_name = tempfile.mkstemp(
+            prefix=f'{cache_file.name}.', suffix='.tmp', dir=cache_file.parent
         )
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(cfg, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_name, cache_file)
+    except Exception:
+        if tmp_name is not None:
+            with contextlib.suppress(OSError):
+                os.unlink(tmp_name)
 
 
 def load_config(config_file: Union[str, Path]) -> Config:
-    """Load YAML and return a Config object."""
+    """
+    Load YAML and return a Config object.
+
+    Parsed configs are cached as pickles in a per-user directory under the
+    system temp directory, keyed on hashes of the YAML contents and of the
+    Config definition, so repeated per-subject jobs skip re-parsing.
+    """
     path = _to_path(config_file)
-    if not path.exists():
-        raise ConfigError(f'Config file not found: {config_file}')
+    try:
+        raw = path.read_bytes()
+    except FileNotFoundError as e:
+        raise ConfigError(f'Config file not found: {config_file}') from e
+
+    cache_file = _config_cache_file(raw)
+    if cache_file is not None:
+        cfg = _read_cached_config(cache_file)
+        if cfg is not None:
+            return cfg
 
-    with open(path, 'r') as f:
-        data = yaml.safe_load(f)
+    data = yaml.load(raw, Loader=_Loader)
 
     # Convert only *known* path fields to Path objects (not globs)
     path_keys = {
@@ -99,7 +230,10 @@ def load_config(config_file: Union[str, Path]) -> Config:
         if key in data and isinstance(data[key], str):
             data[key] = Path(data[key])
 
-    return Config(**data)
+    cfg = Config(**data)
+    if cache_file is not None:
+        _write_cached_config(cfg, cache_file)
+    return cfg
 
 
 if __name__ == '__main__':
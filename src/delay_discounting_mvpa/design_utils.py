@@ -1,10 +1,14 @@
-from typing import List, Tuple
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Tuple
 
 import nibabel as nib
 import numpy as np
 import pandas as pd
+from joblib import Parallel, delayed
+from nibabel.openers import ImageOpener
 from nilearn.glm.first_level.hemodynamic_models import spm_hrf, spm_time_derivative
-from scipy.signal import fftconvolve
+from scipy.fft import irfft, next_fast_len, rfft
 
 from delay_discounting_mvpa.config_loader import Config
 from delay_discounting_mvpa.io_utils import load_tsv_data, resolve_file
@@ -35,13 +39,101 @@ def make_stick_array(
     np.ndarray
         Stick function array of shape (n_points,).
     """
+    onsets = np.asarray(onsets, dtype=float)
+    rows = np.zeros(len(onsets), dtype=np.intp)
+    return make_stick_arrays(onsets, durations, rows, 1, length, resolution)[0]
+
+
+def make_stick_arrays(
+    onsets: np.ndarray,
+    durations: np.ndarray,
+    rows: np.ndarray,
+    n_rows: int,
+    length: float,
+    resolution: float = 0.2,
+) -> np.ndarray:
+    """
+    Create one binary stick-function array per row label in a single pass.
+
+    Parameters
+    ----------
+    onsets : np.ndarray
+        Array of event onset times (in seconds).
+    durations : np.ndarray
+        Array of event durations (in seconds).
+    rows : np.ndarray
+        Integer row (e.g. trial-type code) in [0, n_rows) for each event.
+    n_rows : int
+        Number of stick functions to build.
+    length : float
+        Total duration (in seconds) of each array.
+    resolution : float, default=0.2
+        Temporal resolution of the arrays (in seconds).
+
+    Returns
+    -------
+    np.ndarray
+        Stick function arrays of shape (n_rows, n_points).
+    """
     n_points = int(np.ceil(length / resolution))
-    sf = np.zeros(n_points, dtype=np.float32)
-    for onset, dur in zip(onsets, durations):
-        start_idx = int(np.floor(onset / resolution))
-        end_idx = int(np.ceil((onset + dur) / resolution))
-        sf[start_idx:end_idx] = 1.0
-    return sf
+    onsets = np.asarray(onsets, dtype=float)
+    durations = np.asarray(durations, dtype=float)
+    rows = np.asarray(rows, dtype=np.intp)
+    if not (np.isfinite(onsets).all() and np.isfinite(durations).all()):
+        raise ValueError('Event onsets and durations must be finite')
+    start_idx = np.floor(onsets / resolution).astype(np.intp)
+    end_idx = np.ceil((onsets + durations) / resolution).astype(np.intp)
+    np.clip(start_idx, 0, n_points, out=start_idx)
+    np.clip(end_idx, 0, n_points, out=end_idx)
+
+    # Empty or negative spans set nothing (as slicing did); drop them so their
+    # edges cannot cancel overlapping events in the same row
+    keep = end_idx > start_idx
+    rows, start_idx, end_idx = rows[keep], start_idx[keep], end_idx[keep]
+
+    # Mark each [start, end) span with +1/-1 edges; a running sum > 0 is "on"
+    edges = np.zeros((n_rows, n_points + 1), dtype=np.int32)
+    np.add.at(edges, (rows, start_idx), 1)
+    np.add.at(edges, (rows, end_idx), -1)
+    return (np.cumsum(edges[:, :-1], axis=1) > 0).astype(np.float32)
+
+
+@lru_cache(maxsize=8)
+def _hrf_cached(
+    tr: float, oversampling: int, add_deriv: bool
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    SPM HRF and (if add_deriv) its time derivative, sampled at tr / oversampling.
+
+    Cached because the whole cohort shares a TR; returned arrays are read-only.
+    """
+    hrf = spm_hrf(tr, oversampling=oversampling)
+    hrf.flags.writeable = False
+    hrf_deriv = None
+    if add_deriv:
+        hrf_deriv = spm_time_derivative(tr, oversampling=oversampling)
+        hrf_deriv.flags.writeable = False
+    return hrf, hrf_deriv
+
+
+@lru_cache(maxsize=8)
+def _hrf_rfft_cached(
+    tr: float, oversampling: int, n_fft: int, add_deriv: bool
+) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Real FFTs of the kernels from _hrf_cached, zero-padded to n_fft.
+
+    Cached so subjects sharing a TR and run length reuse the transforms. The
+    returned arrays are read-only.
+    """
+    kernels_f = []
+    for kernel in _hrf_cached(tr, oversampling, add_deriv):
+        kernel_f = None
+        if kernel is not None:
+            kernel_f = rfft(kernel, n=n_fft)
+            kernel_f.flags.writeable = False
+        kernels_f.append(kernel_f)
+    return tuple(kernels_f)
 
 
 def create_cosine_drift(cutoff_hz: float, timepoints: np.ndarray) -> np.ndarray:
@@ -66,10 +158,8 @@ def create_cosine_drift(cutoff_hz: float, timepoints: np.ndarray) -> np.ndarray:
     if n_cos < 1:
         return np.zeros((n, 0))
 
-    dct_basis = np.zeros((n, n_cos))
-    for k in range(1, n_cos + 1):
-        dct_basis[:, k - 1] = np.cos(np.pi * (2 * t + 1) * k / (2 * n))
-    return dct_basis
+    k = np.arange(1, n_cos + 1, dtype=np.float64)
+    return np.cos(np.pi * (2 * t[:, None] + 1) * k[None, :] / (2 * n))
 
 
 def create_design_matrix(
@@ -80,6 +170,7 @@ def create_design_matrix(
     num_trs: int = 100,
     verbose: bool = False,
     add_deriv: bool = False,
+    fft_workers: int = -1,
 ) -> pd.DataFrame:
     """
     Create an fMRI design matrix by convolving events with an HRF.
@@ -100,6 +191,8 @@ def create_design_matrix(
         If True, print diagnostic information.
     add_deriv : bool, default=False
         If True, include HRF temporal derivative regressors.
+    fft_workers : int, default=-1
+        Threads for the batched convolution FFTs (-1 uses all cores).
 
     Returns
     -------
@@ -112,47 +205,73 @@ def create_design_matrix(
     conv_points = int(num_trs * oversampling)
     timepoints_conv = np.linspace(0, maxtime, conv_points, endpoint=False)
 
-    # Precompute HRF
-    hrf = spm_hrf(tr, oversampling=oversampling)
-    hrf_deriv = (
-        spm_time_derivative(tr, oversampling=oversampling) if add_deriv else None
-    )
-
-    conv_dict: dict[str, np.ndarray] = {}
+    # Precomputed HRF (shared across calls with the same TR)
+    hrf, hrf_deriv = _hrf_cached(tr, oversampling, add_deriv)
 
-    trial_types = events_df_long['trial_type'].unique()
+    # One hash pass over trial_type (first-appearance order, like unique())
+    # instead of a boolean scan of the events per trial type
+    trial_codes, trial_types = pd.factorize(
+        events_df_long['trial_type'], use_na_sentinel=False
+    )
     if verbose:
         print(
             f'Maxtime: {maxtime}, TRs: {num_trs}, conv points: {len(timepoints_conv)}'
         )
-    for trial_type in trial_types:
-        trial_events = events_df_long[events_df_long['trial_type'] == trial_type]
-        onsets = trial_events['onset'].values
-        durations = trial_events['duration'].values
-
-        sf_array = make_stick_array(onsets, durations, maxtime, conv_resolution)
 
-        # Convolve with HRF using FFT
-        conv_signal = fftconvolve(sf_array, hrf)[: len(sf_array)]
-        conv_dict[trial_type] = conv_signal[::oversampling]  # downsample to TRs
-
-        if add_deriv and hrf_deriv is not None:
-            deriv_signal = fftconvolve(sf_array, hrf_deriv)[: len(sf_array)]
-            conv_dict[f'{trial_type}_derivative'] = deriv_signal[::oversampling]
-    desmtx_conv = pd.DataFrame(conv_dict, index=timepoints_data)
-    desmtx_conv['constant'] = 1.0
+    # Stack every trial type's stick function so all convolutions share one FFT
+    sticks = make_stick_arrays(
+        events_df_long['onset'].to_numpy(),
+        events_df_long['duration'].to_numpy(),
+        trial_codes,
+        len(trial_types),
+        maxtime,
+        conv_resolution,
+    ).astype(np.float64)
+    n_points = sticks.shape[1]
+
+    # Convolve with HRF using FFT, padded for linear (not circular) convolution
+    # and rounded up to a length pocketfft handles efficiently
+    kernel_len = max(len(hrf), len(hrf_deriv)) if add_deriv else len(hrf)
+    n_fft = next_fast_len(n_points + kernel_len - 1, real=True)
+    hrf_f, hrf_deriv_f = _hrf_rfft_cached(tr, oversampling, n_fft, add_deriv)
+    sticks_f = rfft(sticks, n=n_fft, axis=1, workers=fft_workers)
+    conv = irfft(sticks_f * hrf_f, n=n_fft, axis=1, workers=fft_workers)
+    conv = conv[:, :n_points:oversampling]  # downsample to TRs
+    if add_deriv:
+        deriv = irfft(sticks_f * hrf_deriv_f, n=n_fft, axis=1, workers=fft_workers)
+        deriv = deriv[:, :n_points:oversampling]
 
     if hp_filter_cutoff:
         dct_basis = create_cosine_drift(hp_filter_cutoff, timepoints_data)
-        dct_df = pd.DataFrame(
-            dct_basis, columns=[f'cosine{i}' for i in range(dct_basis.shape[1])]
-        )
-        dct_df = dct_df.loc[:, dct_df.nunique() > 1]  # drop redundant columns
-        desmtx_conv = pd.concat(
-            [desmtx_conv.reset_index(drop=True), dct_df.reset_index(drop=True)], axis=1
-        )
-
-    return desmtx_conv
+        dct_names = np.array([f'cosine{i}' for i in range(dct_basis.shape[1])])
+        keep = np.ptp(dct_basis, axis=0) > 1e-12  # drop constant columns
+        dct_basis = dct_basis[:, keep]
+        dct_names = dct_names[keep].tolist()
+    else:
+        dct_basis = np.empty((num_trs, 0))
+        dct_names = []
+
+    # Fill one preallocated array (regressors, constant, drift) and wrap it in a
+    # DataFrame once, rather than building and concatenating several frames
+    n_conv = len(trial_types) * (2 if add_deriv else 1)
+    desmtx = np.empty((num_trs, n_conv + 1 + dct_basis.shape[1]))
+    col_names: list[str] = []
+    if add_deriv:
+        desmtx[:, 0:n_conv:2] = conv.T
+        desmtx[:, 1:n_conv:2] = deriv.T
+        for trial_type in trial_types:
+            col_names += [trial_type, f'{trial_type}_derivative']
+    else:
+        desmtx[:, :n_conv] = conv.T
+        col_names += list(trial_types)
+    desmtx[:, n_conv] = 1.0
+    col_names.append('constant')
+    desmtx[:, n_conv + 1 :] = dct_basis
+    col_names += dct_names
+
+    # Drift columns were historically concatenated with a reset index
+    index = None if hp_filter_cutoff else timepoints_data
+    return pd.DataFrame(desmtx, columns=col_names, index=index, copy=False)
 
 
 def get_exclusion_data(cfg: Config) -> pd.DataFrame:
@@ -178,9 +297,18 @@ def get_exclusion_data(cfg: Config) -> pd.DataFrame:
     """
     exclusion_file = cfg.bids_dir / 'suggested_exclusions.csv'
 
-    if not exclusion_file.exists():
-        raise FileNotFoundError(f'Exclusion file not found: {exclusion_file}')
+    try:
+        mtime_ns = exclusion_file.stat().st_mtime_ns
+    except FileNotFoundError:
+        raise FileNotFoundError(f'Exclusion file not found: {exclusion_file}') from None
+
+    # Cached per file version; hand out copies so callers can't alter the cache
+    return _load_exclusion_data(str(exclusion_file), mtime_ns).copy()
 
+
+@lru_cache(maxsize=4)
+def _load_exclusion_data(exclusion_file: str, mtime_ns: int) -> pd.DataFrame:
+    """Parse suggested_exclusions.csv; mtime_ns is only part of the cache key."""
     exclusion_data = pd.read_csv(exclusion_file)
 
     # Ensure expected column exists
@@ -197,7 +325,8 @@ def get_exclusion_data(cfg: Config) -> pd.DataFrame:
     )
 
     # Filter for discountFix
-    exclusion_discount_fix = exclusion_data.query("task == 'discountFix'").copy()
+    is_discount_fix = exclusion_data['task'].to_numpy() == 'discountFix'
+    exclusion_discount_fix = exclusion_data[is_discount_fix]
 
     # Drop redundant and reorder columns
     exclusion_discount_fix = exclusion_discount_fix.drop(columns=['subject_task'])
@@ -209,12 +338,148 @@ def get_exclusion_data(cfg: Config) -> pd.DataFrame:
     return exclusion_discount_fix
 
 
+def _read_n_scans(bold_file: Path) -> int:
+    """
+    Number of volumes in a 4D BOLD file, read from the NIfTI-1 header alone.
+
+    Skips the image-type sniffing and data proxy setup of nib.load; falls back
+    to it for files that are not NIfTI-1 (e.g. NIfTI-2).
+    """
+    with ImageOpener(bold_file) as f:
+        raw = f.read(nib.Nifti1Header.sizeof_hdr)
+    header = nib.Nifti1Header(raw, check=False)
+    if header['sizeof_hdr'] != nib.Nifti1Header.sizeof_hdr:
+        return nib.load(bold_file).shape[-1]
+    return int(header.get_data_shape()[-1])
+
+
+def _process_subject(
+    cfg: Config,
+    subid: str,
+    tr: float,
+    hp_filter_cutoff: float,
+    exclusion_row: Optional[dict],
+    fft_workers: int = -1,
+) -> dict:
+    """
+    Run the inclusion checks and build the design matrix for one subject.
+
+    Kept free of side effects so create_design_matrices can run subjects in
+    parallel worker processes; progress messages are returned in 'log' and
+    printed by the caller. exclusion_row holds the subject's
+    suggested_exclusions.csv criteria (None if the subject is not listed).
+
+    Returns:
+        dict with 'subid', 'bold_file' and 'design_matrix' (both None if the
+        subject was skipped), the 'status' record and the 'log' messages.
+    """
+    log = [f'Processing {subid}...']
+
+    def skipped(reason: str, message: Optional[str] = None) -> dict:
+        log.append(message or f'Skipping {subid} ({reason})')
+        return {
+            'subid': subid,
+            'bold_file': None,
+            'design_matrix': None,
+            'status': {'sub_id': subid, 'include': False, 'reason': reason},
+            'log': log,
+        }
+
+    # --- Load behavioral data ---
+    try:
+        behav_file = resolve_file(cfg, subid, 'behav')
+        events_data_loop = load_tsv_data(behav_file)
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        return skipped(f'behav missing: {e}')
+
+    # --- Check exclusion criteria from suggested_exclusions.csv ---
+    if exclusion_row is not None:
+        # Only keep criteria with nonzero values
+        criteria_met = [k for k, v in exclusion_row.items() if bool(v)]
+        if criteria_met:
+            return skipped(
+                'met suggested_exclusion.csv criteria: ' + ', '.join(criteria_met)
+            )
+
+    # --- Check for both choice types ---
+    num_ss = (events_data_loop['choice'] == 'smaller_sooner').sum()
+    num_ll = (events_data_loop['choice'] == 'larger_later').sum()
+    if num_ss == 0 or num_ll == 0:
+        return skipped(
+            f'singular response: {num_ss} smaller sooner / {num_ll} larger later'
+        )
+
+    # --- Load BOLD path ---
+    try:
+        bold_file = resolve_file(cfg, subid, 'bold')
+    except (FileNotFoundError, KeyError, ValueError) as e:
+        return skipped(f'BOLD missing: {e}')
+
+    # --- Get header info ---
+    try:
+        n_scans = _read_n_scans(bold_file)
+        scan_duration = n_scans * tr
+    except Exception as e:
+        return skipped(f'cannot read BOLD header: {e}')
+
+    # --- Prepare events DataFrame ---
+    events = pd.DataFrame(
+        {
+            'onset': events_data_loop['onset'],
+            'duration': events_data_loop['duration'],
+            'trial_index': np.arange(len(events_data_loop)),
+        }
+    )
+
+    num_negative = (events['onset'] < 0).sum()
+    if num_negative > 0:
+        log.append(f'{subid}: removing {num_negative} trial(s) with negative onset(s)')
+        events = events[events['onset'] >= 0].reset_index(drop=True)
+
+    events['trial_type'] = (
+        events_data_loop.loc[events.index, 'choice']
+        + '_'
+        + (events['trial_index'] + 1).astype(str)
+    )
+
+    # --- Check scan duration ---
+    max_onset = events['onset'].max()
+    if max_onset > scan_duration:
+        reason = f'onset beyond scan duration: max onset={max_onset:.2f}s, scan duration={scan_duration:.2f}s'
+        return skipped(reason, f'Skipping {subid}: {reason}')
+
+    # --- Try design matrix creation ---
+    try:
+        design_matrix = create_design_matrix(
+            events[['onset', 'duration', 'trial_type']],
+            hp_filter_cutoff,
+            oversampling=10,
+            tr=tr,
+            num_trs=n_scans,
+            fft_workers=fft_workers,
+        )
+    except Exception as e:
+        return skipped(f'design matrix error: {e}')
+
+    # --- Success ---
+    return {
+        'subid': subid,
+        'bold_file': bold_file,
+        'design_matrix': design_matrix,
+        'status': {'sub_id': subid, 'include': True, 'reason': 'Passed all checks'},
+        'log': log,
+    }
+
+
 def create_design_matrices(
-    cfg, subids: List[str], tr: float, hp_filter_cutoff: float
+    cfg, subids: List[str], tr: float, hp_filter_cutoff: float, n_jobs: int = -1
 ) -> Tuple[List[str], List[str], List[pd.DataFrame], pd.DataFrame]:
     """
     Create first-level design matrices for each subject.
 
+    Subjects are independent, so they are processed in parallel with joblib
+    (n_jobs workers, -1 for all cores; a single subject always runs in-process).
+
     Returns:
         valid_subids: list of subjects successfully processed
         bold_paths: list of BOLD paths corresponding to valid subjects
@@ -230,117 +495,35 @@ def create_design_matrices(
     exclusion_data = get_exclusion_data(cfg)
     # Josh doesn't want to exclude these subjects
     exclusion_data = exclusion_data[['subject', 'task', 'MRIQC_fail']]
+    # subject -> {criterion: value}, so each subject is a hash lookup (first row
+    # wins for duplicated subjects) and workers only receive their own row
+    exclusion_rows = (
+        exclusion_data.drop_duplicates('subject')
+        .set_index('subject')
+        .drop(columns=['task'])
+        .to_dict(orient='index')
+    )
 
-    for subid in subids:
-        print(f'Processing {subid}...')
-
-        # --- Load behavioral data ---
-        try:
-            behav_file = resolve_file(cfg, subid, 'behav')
-            events_data_loop = load_tsv_data(behav_file)
-        except (FileNotFoundError, KeyError, ValueError) as e:
-            reason = f'behav missing: {e}'
-            print(f'Skipping {subid} ({reason})')
-            status_records.append({'sub_id': subid, 'include': False, 'reason': reason})
-            continue
-
-        # --- Check exclusion criteria from suggested_exclusions.csv ---
-        sub_excl_row = exclusion_data[exclusion_data['subject'] == subid]
-        if not sub_excl_row.empty:
-            # Drop 'subject' and 'task' columns, only keep columns with nonzero values
-            nonzero_cols = sub_excl_row.drop(columns=['subject', 'task']).astype(bool)
-            criteria_met = nonzero_cols.columns[nonzero_cols.iloc[0]].tolist()
-            if criteria_met:
-                reason = 'met suggested_exclusion.csv criteria: ' + ', '.join(
-                    criteria_met
-                )
-                print(f'Skipping {subid} ({reason})')
-                status_records.append(
-                    {'sub_id': subid, 'include': False, 'reason': reason}
-                )
-                continue
-
-        # --- Check for both choice types ---
-        num_ss = (events_data_loop['choice'] == 'smaller_sooner').sum()
-        num_ll = (events_data_loop['choice'] == 'larger_later').sum()
-        if num_ss == 0 or num_ll == 0:
-            reason = (
-                f'singular response: {num_ss} smaller sooner / {num_ll} larger later'
-            )
-            print(f'Skipping {subid} ({reason})')
-            status_records.append({'sub_id': subid, 'include': False, 'reason': reason})
-            continue
-
-        # --- Load BOLD path ---
-        try:
-            bold_file = resolve_file(cfg, subid, 'bold')
-        except (FileNotFoundError, KeyError, ValueError) as e:
-            reason = f'BOLD missing: {e}'
-            print(f'Skipping {subid} ({reason})')
-            status_records.append({'sub_id': subid, 'include': False, 'reason': reason})
-            continue
-
-        # --- Get header info ---
-        try:
-            bold_img = nib.load(bold_file)
-            n_scans = bold_img.shape[-1]
-            scan_duration = n_scans * tr
-        except Exception as e:
-            reason = f'cannot read BOLD header: {e}'
-            print(f'Skipping {subid} ({reason})')
-            status_records.append({'sub_id': subid, 'include': False, 'reason': reason})
-            continue
-
-        # --- Prepare events DataFrame ---
-        events = pd.DataFrame(
-            {
-                'onset': events_data_loop['onset'],
-                'duration': events_data_loop['duration'],
-                'trial_index': np.arange(len(events_data_loop)),
-            }
-        )
-
-        num_negative = (events['onset'] < 0).sum()
-        if num_negative > 0:
-            print(f'{subid}: removing {num_negative} trial(s) with negative onset(s)')
-            events = events[events['onset'] >= 0].reset_index(drop=True)
-
-        events['trial_type'] = (
-            events_data_loop.loc[events.index, 'choice']
-            + '_'
-            + (events['trial_index'] + 1).astype(str)
+    if len(subids) < 2:
+        n_jobs = 1
+    # Threaded FFTs only when subjects aren't already spread across cores
+    fft_workers = -1 if n_jobs == 1 else 1
+    results = Parallel(n_jobs=n_jobs, backend='loky')(
+        delayed(_process_subject)(
+            cfg, subid, tr, hp_filter_cutoff, exclusion_rows.get(subid), fft_workers
         )
+        for subid in subids
+    )
 
-        # --- Check scan duration ---
-        max_onset = events['onset'].max()
-        if max_onset > scan_duration:
-            reason = f'onset beyond scan duration: max onset={max_onset:.2f}s, scan duration={scan_duration:.2f}s'
-            print(f'Skipping {subid}: {reason}')
-            status_records.append({'sub_id': subid, 'include': False, 'reason': reason})
-            continue
-
-        # --- Try design matrix creation ---
-        try:
-            design_matrix = create_design_matrix(
-                events[['onset', 'duration', 'trial_type']],
-                hp_filter_cutoff,
-                oversampling=10,
-                tr=tr,
-                num_trs=n_scans,
-            )
-        except Exception as e:
-            reason = f'design matrix error: {e}'
-            print(f'Skipping {subid} ({reason})')
-            status_records.append({'sub_id': subid, 'include': False, 'reason': reason})
-            continue
-
-        # --- Success ---
-        valid_subids.append(subid)
-        bold_paths.append(bold_file)
-        design_matrices.append(design_matrix)
-        status_records.append(
-            {'sub_id': subid, 'include': True, 'reason': 'Passed all checks'}
-        )
+    # Results come back in subject order, so the log reads as if run serially
+    for result in results:
+        for message in result['log']:
+            print(message)
+        status_records.append(result['status'])
+        if result['design_matrix'] is not None:
+            valid_subids.append(result['subid'])
+            bold_paths.append(result['bold_file'])
+            design_matrices.append(result['design_matrix'])
 
     status_df = pd.DataFrame(status_records)
     return valid_subids, bold_paths, design_matrices, status_df
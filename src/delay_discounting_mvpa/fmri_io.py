@@ -2,8 +2,9 @@ import sys
 from pathlib import Path
 from typing import Optional, Tuple
 
+import nibabel as nib
 import numpy as np
-from nilearn.image import resample_to_img
+from nilearn.image import get_data, resample_to_img
 from nilearn.input_data import NiftiMasker
 
 from delay_discounting_mvpa.config_loader import Config
@@ -13,7 +14,7 @@ from delay_discounting_mvpa.io_utils import (
 
 
 def calculate_grand_mean_scale(
-    cfg: Config, subid: str
+    cfg: Config, subid: str, bold_img: Optional[nib.Nifti1Image] = None
 ) -> Tuple[float, np.ndarray, NiftiMasker]:
     """
     Compute brain scale factor and scaled whole-brain data.
@@ -24,6 +25,10 @@ def calculate_grand_mean_scale(
         Configuration object.
     subid : str
         Subject ID.
+    bold_img : nib.Nifti1Image, optional
+        Already-loaded BOLD image for the subject. Passing it lets callers reuse
+        the image (and its cached data) for further masking without re-reading
+        the file. Loaded from the subject's BOLD file if omitted.
 
     Returns
     -------
@@ -34,19 +39,63 @@ def calculate_grand_mean_scale(
     brain_masker : NiftiMasker
         Fitted masker for inverse-transform.
     """
-    bold_file = resolve_file(cfg, subid, 'bold')
+    if bold_img is None:
+        bold_img = nib.load(resolve_file(cfg, subid, 'bold'))
     brain_mask_file = resolve_file(cfg, subid, 'mask')
 
     brain_masker = NiftiMasker(mask_img=brain_mask_file, standardize=False)
-    brain_data = brain_masker.fit_transform(bold_file)
+    # float32 halves the memory of the (timepoints x voxels) array
+    brain_data = brain_masker.fit_transform(bold_img).astype(np.float32, copy=False)
 
-    grand_mean = brain_data.mean()
-    scale_factor = 100.0 / grand_mean
+    grand_mean = brain_data.mean(dtype=np.float64)
+    # Python float so scaling keeps the float32 dtype
+    scale_factor = 100.0 / float(grand_mean)
 
     scaled_brain_data = brain_data * scale_factor
     return scale_factor, scaled_brain_data, brain_masker
 
 
+def compute_scale_factor(
+    cfg: Config, subid: str, bold_img: Optional[nib.Nifti1Image] = None
+) -> float:
+    """
+    Compute the grand mean scale factor without building the masked data matrix.
+
+    Same value as the scale factor from `calculate_grand_mean_scale`, but sums
+    each voxel over time directly in the 4D array instead of extracting a
+    (timepoints x voxels) copy, for callers that do not need whole-brain data.
+
+    Parameters
+    ----------
+    cfg : Config
+        Configuration object.
+    subid : str
+        Subject ID.
+    bold_img : nib.Nifti1Image, optional
+        Already-loaded BOLD image for the subject; its data is cached on the
+        image for reuse. Loaded from the subject's BOLD file if omitted.
+
+    Returns
+    -------
+    scale_factor : float
+        Factor to scale global mean to 100.
+    """
+    if bold_img is None:
+        bold_img = nib.load(resolve_file(cfg, subid, 'bold'))
+    mask_img = nib.load(resolve_file(cfg, subid, 'mask'))
+
+    # NiftiMasker would resample a mask on a different grid; defer to it then
+    if mask_img.shape != bold_img.shape[:3] or not np.allclose(
+        mask_img.affine, bold_img.affine
+    ):
+        return calculate_grand_mean_scale(cfg, subid, bold_img=bold_img)[0]
+
+    mask = get_data(mask_img) != 0
+    voxel_sums = get_data(bold_img).sum(axis=-1, dtype=np.float64)
+    grand_mean = voxel_sums[mask].sum() / (mask.sum() * bold_img.shape[-1])
+    return 100.0 / float(grand_mean)
+
+
 def load_and_gm_scale_bold_data(
     cfg: Config,
     subid: str,
@@ -84,12 +133,14 @@ def load_and_gm_scale_bold_data(
     FileNotFoundError
         If ROI mask file does not exist.
     """
-    bold_file = resolve_file(cfg, subid, 'bold')
-    scale_factor, scaled_brain_data, brain_masker = calculate_grand_mean_scale(
-        cfg, subid
-    )
+    # Load once so the ROI branch reuses the decompressed data instead of
+    # re-reading the BOLD file
+    bold_img = nib.load(resolve_file(cfg, subid, 'bold'))
 
     if mask_type == 'brain':
+        _, scaled_brain_data, brain_masker = calculate_grand_mean_scale(
+            cfg, subid, bold_img=bold_img
+        )
         return scaled_brain_data, brain_masker
 
     if mask_type == 'roi':
@@ -103,14 +154,17 @@ def load_and_gm_scale_bold_data(
         # Resample ROI mask to match BOLD data
         roi_mask_resamp = resample_to_img(
             roi_mask_file,
-            bold_file,
+            bold_img,
             interpolation='nearest',
             force_resample=True,
             copy_header=True,
         )
 
+        # Only the scale factor is needed from the whole brain here
+        scale_factor = compute_scale_factor(cfg, subid, bold_img=bold_img)
+
         roi_masker = NiftiMasker(mask_img=roi_mask_resamp, standardize=False)
-        roi_data = roi_masker.fit_transform(bold_file)
+        roi_data = roi_masker.fit_transform(bold_img).astype(np.float32, copy=False)
         roi_data_scaled = roi_data * scale_factor
         return roi_data_scaled, roi_masker
 
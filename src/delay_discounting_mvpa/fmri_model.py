@@ -5,6 +5,14 @@ from typing import Union
 import numpy as np
 import pandas as pd
 from nilearn.input_data import NiftiMasker
+from scipy.linalg import cho_factor, cho_solve
+
+# Design-matrix columns that are trial regressors, and their "_<trial>" suffix
+_TRIAL_REGRESSOR_RE = re.compile(r'(?:smaller|larger|false)')
+_TRIAL_NUMBER_RE = re.compile(r'_\d+$')
+
+# Voxels per float64 block when forming X^T Y in compute_betas
+_VOXEL_BLOCK_SIZE = 8192
 
 
 def compute_betas(
@@ -12,7 +20,7 @@ def compute_betas(
     data_array: np.ndarray,
 ) -> np.ndarray:
     """
-    Compute OLS beta estimates for all voxels using matrix multiplication.
+    Compute OLS beta estimates for all voxels by solving the normal equations.
 
     Parameters
     ----------
@@ -26,14 +34,21 @@ def compute_betas(
     betas : np.ndarray
         Estimated betas, shape (nbetas, nvox).
     """
-    X = np.asarray(desmat)  # (ntime, nbetas)
-    Y = np.asarray(data_array)  # (ntime, nvox)
-
-    # Compute (X^T X)^-1
-    XtX_inv = np.linalg.inv(X.T @ X)  # (nbetas, nbetas)
-
-    # Compute betas: (X^T X)^-1 X^T Y
-    betas = np.einsum('ij,jk->ik', XtX_inv @ X.T, Y)  # (nbetas, nvox)
+    X = np.asarray(desmat, dtype=np.float64)  # (ntime, nbetas)
+    Y = np.asarray(data_array)  # (ntime, nvox), typically float32
+
+    # Accumulate X^T Y in float64 one voxel block at a time: LSA designs are
+    # too ill-conditioned for a float32 product, and upcasting all of Y at
+    # once would double its memory footprint
+    XtY = np.empty((X.shape[1], Y.shape[1]))  # (nbetas, nvox)
+    for start in range(0, Y.shape[1], _VOXEL_BLOCK_SIZE):
+        block = slice(start, start + _VOXEL_BLOCK_SIZE)
+        XtY[:, block] = X.T @ Y[:, block]
+
+    # Solve the normal equations (X^T X) betas = X^T Y via Cholesky rather
+    # than forming (X^T X)^-1 explicitly
+    XtX_chol = cho_factor(X.T @ X, lower=True, overwrite_a=True, check_finite=False)
+    betas = cho_solve(XtX_chol, XtY, overwrite_b=True, check_finite=False)
 
     return betas
 
@@ -70,11 +85,13 @@ def save_beta_series(
     output_path.mkdir(parents=True, exist_ok=True)
 
     # Step 1: find trial regressors of interest
-    keep_mask = desmat.columns.str.contains(r'(?:smaller|larger|false)', regex=True)
+    keep_mask = desmat.columns.str.contains(_TRIAL_REGRESSOR_RE)
     kept_labels = desmat.columns[keep_mask]
 
     # Step 2: simplify names (remove trailing "_number")
-    simplified_labels = [re.sub(r'_\d+$', '', lbl) for lbl in kept_labels]
+    simplified_labels = kept_labels.str.replace(
+        _TRIAL_NUMBER_RE, '', regex=True
+    ).tolist()
 
     # Step 3: filter betas
     betas_kept = betas[keep_mask, :]
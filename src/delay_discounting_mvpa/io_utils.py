@@ -2,12 +2,69 @@ import os
 import re
 from glob import glob
 from pathlib import Path
-from typing import List
+from typing import Dict, List, Optional, Tuple
 
 import pandas as pd
 
 from delay_discounting_mvpa.config_loader import Config
 
+# fMRIPrep subject directory names, e.g. "sub-s101"
+_SUBID_RE = re.compile(r'sub-(s\d+)')
+
+# Glob wildcard characters (same check as glob's own has_magic)
+_GLOB_MAGIC_RE = re.compile(r'[*?[]')
+
+# pattern -> (matches, ((directory, st_mtime_ns), ...)) for resolve_file
+_GLOB_CACHE: Dict[str, Tuple[Tuple[str, ...], Tuple[Tuple[str, int], ...]]] = {}
+
+
+def _glob_dirs(pattern: str) -> List[str]:
+    """
+    Directories whose listings determine glob(pattern): every match of each
+    wildcard parent level, plus the first literal ancestor above them.
+    """
+    dirs = []
+    dir_pattern = os.path.dirname(pattern)
+    while _GLOB_MAGIC_RE.search(dir_pattern):
+        dirs.extend(glob(dir_pattern))
+        dir_pattern = os.path.dirname(dir_pattern)
+    dirs.append(dir_pattern)
+    return dirs
+
+
+def _dir_stamps(dirs: List[str]) -> Optional[Tuple[Tuple[str, int], ...]]:
+    """(directory, st_mtime_ns) pairs, or None if any directory is missing."""
+    try:
+        return tuple((d, os.stat(d).st_mtime_ns) for d in dirs)
+    except OSError:
+        return None
+
+
+def _glob_cached(pattern: str) -> Tuple[str, ...]:
+    """
+    Memoized glob, so repeated lookups for a subject don't re-walk its directory.
+
+    A cached result is reused only while none of the directories the glob read
+    has changed (adding, removing or renaming an entry updates a directory's
+    mtime), so new sessions, new files and deleted duplicates are all picked
+    up. Call ``_GLOB_CACHE.clear()`` to drop every cached result.
+    """
+    cached = _GLOB_CACHE.get(pattern)
+    if cached is not None:
+        matches, stamps = cached
+        if _dir_stamps([d for d, _ in stamps]) == stamps:
+            return matches
+
+    # Stamp before globbing so a change made mid-glob invalidates the entry
+    dirs = _glob_dirs(pattern)
+    stamps = _dir_stamps(dirs)
+    matches = tuple(glob(pattern))
+    if stamps is None:
+        _GLOB_CACHE.pop(pattern, None)
+    else:
+        _GLOB_CACHE[pattern] = (matches, stamps)
+    return matches
+
 
 def resolve_file(cfg: Config, subject_id: str, kind: str) -> Path:
     """
@@ -44,13 +101,14 @@ def resolve_file(cfg: Config, subject_id: str, kind: str) -> Path:
             f"Unknown file kind: {kind!r}. Must be 'bold', 'mask', or 'behav'."
         )
 
-    matches = glob(pattern)
+    matches = _glob_cached(pattern)
 
     if not matches:
         raise ValueError(f'No files found for {kind!r} with pattern: {pattern}')
     if len(matches) > 1:
         raise ValueError(
-            f'Multiple files found for {kind!r} with pattern: {pattern}\n{matches}'
+            f'Multiple files found for {kind!r} with pattern: {pattern}\n'
+            f'{list(matches)}'
         )
 
     return Path(matches[0])
@@ -98,10 +156,11 @@ def get_subids(cfg: Config) -> List[str]:
         Sorted list of subject IDs (e.g., ['s101', 's102']).
     """
     subids: set[str] = set()
-    for d in os.listdir(cfg.fmriprep_dir):
-        full_path = os.path.join(cfg.fmriprep_dir, d)
-        if os.path.isdir(full_path):
-            match = re.match(r'sub-s(\d+)', d)
-            if match:
-                subids.add('s' + match.group(1))
+    # scandir reports the entry type from the directory listing, so no extra
+    # stat per entry (symlinked subject directories are still followed)
+    with os.scandir(cfg.fmriprep_dir) as it:
+        for entry in it:
+            match = _SUBID_RE.match(entry.name)
+            if match and entry.is_dir():
+                subids.add(match.group(1))
     return sorted(subids)
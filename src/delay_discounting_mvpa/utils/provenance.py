@@ -3,11 +3,17 @@ import json
 import socket
 import subprocess
 from datetime import datetime
+from functools import lru_cache
 import argparse
 
 
+@lru_cache(maxsize=1)
 def get_git_commit_hash() -> str:
-    """Return the short git commit hash for the current repo."""
+    """Return the short git commit hash for the current repo.
+
+    Cached per process: the checkout does not change during a run, so
+    repeated ``write_provenance`` calls reuse the first result.
+    """
     try:
         return subprocess.check_output(
             ["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL
@@ -16,8 +22,12 @@ def get_git_commit_hash() -> str:
         return "unknown"
 
 
+@lru_cache(maxsize=1)
 def is_git_dirty() -> bool:
-    """Return True if there are uncommitted changes in the repo."""
+    """Return True if there are uncommitted changes in the repo.
+
+    Cached per process, like ``get_git_commit_hash``.
+    """
     try:
         result = subprocess.check_output(
             ["git", "status", "--porcelain"], stderr=subprocess.DEVNULL